@@ -0,0 +1,71 @@
+"""
+Контроль допуска запросов: ограничение параллельной работы и очередь ожидания.
+"""
+
+from typing import Dict
+import threading
+
+
+class AdmissionController:
+    """Ограничивает число одновременно выполняемых запросов.
+
+    Сверх лимита запросы ждут в ограниченной очереди не дольше queue_timeout секунд.
+    Если очередь заполнена или ожидание истекло, запрос отклоняется сразу, чтобы
+    задержка не росла без ограничений.
+    """
+
+    def __init__(self, max_active: int = 16, max_queued: int = 64, queue_timeout: float = 5.0):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._queued = 0
+        self._rejected = 0
+        self._cond = threading.Condition()
+
+    def configure(self, max_active: int, max_queued: int, queue_timeout: float) -> None:
+        """Обновить лимиты; ожидающие запросы сразу видят новый max_active."""
+        with self._cond:
+            grown = max_active > self.max_active
+            self.max_active = max_active
+            self.max_queued = max_queued
+            self.queue_timeout = queue_timeout
+            if grown:
+                self._cond.notify_all()
+
+    def acquire(self) -> bool:
+        """Занять слот выполнения. Возвращает False, если запрос нужно отклонить."""
+        with self._cond:
+            if self._active < self.max_active and self._queued == 0:
+                self._active += 1
+                return True
+            if self._queued >= self.max_queued:
+                self._rejected += 1
+                return False
+
+            self._queued += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self._active < self.max_active, timeout=self.queue_timeout)
+            finally:
+                self._queued -= 1
+            if admitted:
+                self._active += 1
+            else:
+                self._rejected += 1
+            return admitted
+
+    def release(self) -> None:
+        """Освободить слот выполнения."""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    @property
+    def ready(self) -> bool:
+        """Готов ли сервер принимать новые запросы (очередь не заполнена)."""
+        return self._queued < self.max_queued
+
+    def stats(self) -> Dict[str, int]:
+        """Текущая загрузка: выполняемые, ожидающие и отклоненные запросы."""
+        with self._cond:
+            return {'active': self._active, 'queued': self._queued, 'rejected': self._rejected}
@@ -2,19 +2,241 @@
 Flask веб-приложение с REST API для калькулятора.
 """
 
-from flask import Flask, request, jsonify
-from calculator import Calculator
+import hashlib
+import json
+import time
+import uuid
+
+from flask import Flask, request, jsonify, g, stream_with_context
+from admission import AdmissionController
+from calculator import ROUND_METHODS, Calculator
+from idempotency import CachedResponse, IdempotencyCache
+import binary_format
+import compression
+import server_timing
 
 app = Flask(__name__)
+app.json = server_timing.TimedJSONProvider(app)
+app.config.update(
+    SERVER_TIMING=True,  # добавлять ли к ответам заголовок Server-Timing
+    SLOW_REQUEST_THRESHOLD=None,  # с какой длительности (в секундах) логировать запросы как медленные
+    IDEMPOTENCY_TTL=3600,  # сколько секунд хранится ответ для Idempotency-Key
+    IDEMPOTENCY_MAX_ENTRIES=1024,  # сколько ответов хранится одновременно
+    MAX_ACTIVE_REQUESTS=16,  # сколько запросов выполняется одновременно
+    MAX_QUEUED_REQUESTS=64,  # сколько запросов может ждать своей очереди
+    QUEUE_TIMEOUT=5.0,  # сколько секунд запрос ждет в очереди до отказа
+    RETRY_AFTER=1,  # значение заголовка Retry-After при отказе, в секундах
+    STREAM_CHUNK_SIZE=64 * 1024,  # размер порции потоковых ответов, в байтах
+    SSE_BUFFER_SIZE=256,  # сколько событий копится для медленного подписчика до его отключения
+    SSE_KEEPALIVE=15.0,  # интервал keepalive-комментариев в потоке событий, в секундах
+    STREAM_HISTORY_FLUSH=1000,  # раз в сколько строк потока операций история сохраняется в файл
+    STREAM_HISTORY_FLUSH_INTERVAL=1.0,  # и не реже чем раз в столько секунд
+    COMPRESSION=True,  # сжимать ли ответы (gzip, deflate, brotli при наличии)
+    COMPRESS_MIN_SIZE=1024,  # ответы меньше этого размера (в байтах) не сжимаются
+    COMPRESS_LEVEL=6,  # уровень сжатия
+)
 
 # Создаем глобальный экземпляр калькулятора
 calculator = Calculator()
+calculator.timing_hook = server_timing.record
+
+# Ограничение одновременно выполняемых запросов; лимиты берутся из app.config
+# при каждом запросе (см. _configure_admission), поэтому их можно менять на лету
+admission = AdmissionController()
+
+# Endpoints, которые обслуживаются вне очереди
+_admission_exempt = {'health_check', 'readiness_check'}
+
+# Кэш ответов для повторов POST-запросов с заголовком Idempotency-Key
+# (размер и TTL берутся из app.config при каждом запросе с ключом)
+idempotency_cache = IdempotencyCache()
+
+# Префикс ETag и номеров событий истории уникален для процесса: после перезапуска
+# версия истории и нумерация записей начинаются заново
+_history_etag_prefix = uuid.uuid4().hex[:12]
+
+# Последнее сериализованное тело /api/history: (версия, тело)
+_history_cache = (None, None)
+
+
+@app.before_request
+def start_request_timer():
+    """Запомнить время начала обработки запроса."""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def add_server_timing(response):
+    """Добавить заголовок Server-Timing и залогировать медленный запрос."""
+    total = time.perf_counter() - g.pop('request_start', time.perf_counter())
+    timings = g.pop('server_timing', {})
+    # Сохранение истории происходит внутри вычисления, поэтому вычитаем его из compute
+    if 'compute' in timings and 'persist' in timings:
+        timings['compute'] = max(0.0, timings['compute'] - timings['persist'])
+    timings['total'] = total
+    header = server_timing.format_header(timings)
+
+    if app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = header
+    threshold = app.config['SLOW_REQUEST_THRESHOLD']
+    if threshold is not None and total >= threshold:
+        app.logger.warning('Медленный запрос %s %s: %s', request.method, request.path, header)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Сжать ответ в кодировке, согласованной по Accept-Encoding.
+
+    Обычные ответы сжимаются целиком, если они не меньше COMPRESS_MIN_SIZE. Потоковые
+    ответы сжимаются по порциям по мере отправки.
+    """
+    if (
+        not app.config['COMPRESSION']
+        or response.status_code < 200
+        or response.status_code == 204
+        or 'Content-Encoding' in response.headers
+        or response.direct_passthrough
+        # Массивы float64 почти не сжимаются, а распаковка лишает клиента чтения без копирования
+        or response.mimetype == binary_format.CONTENT_TYPE
+    ):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code == 304:
+        # Тела нет, но Vary должен совпадать с ответом 200, который подтверждает 304
+        return response
+    encoding = compression.negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    level = app.config['COMPRESS_LEVEL']
+    if response.is_streamed:
+        response.response = compression.compress_chunks(response.iter_encoded(), encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        with server_timing.phase('compress'):
+            response.set_data(compression.compress(data, encoding, level))
+
+    response.headers['Content-Encoding'] = encoding
+    # Сжатое представление отличается побайтно, поэтому ETag становится слабым
+    etag, _ = response.get_etag()
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _configure_admission():
+    """Применить к контроллеру допуска текущие лимиты из app.config."""
+    admission.configure(
+        max_active=app.config['MAX_ACTIVE_REQUESTS'],
+        max_queued=app.config['MAX_QUEUED_REQUESTS'],
+        queue_timeout=app.config['QUEUE_TIMEOUT'],
+    )
+
+
+@app.before_request
+def admit_request():
+    """Допустить запрос к вычислениям или быстро отказать при перегрузке."""
+    if request.endpoint is None or request.endpoint in _admission_exempt:
+        return None
+    _configure_admission()
+    with server_timing.phase('queue'):
+        admitted = admission.acquire()
+    if not admitted:
+        response = jsonify({'error': 'Сервер перегружен, повторите запрос позже'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(app.config['RETRY_AFTER'])
+        return response
+    g.admitted = True
+    return None
+
+
+@app.teardown_request
+def release_admission(error):
+    """Освободить слот выполнения после завершения запроса."""
+    if g.pop('admitted', False):
+        admission.release()
+
+
+@app.before_request
+def replay_idempotent_request():
+    """Вернуть сохраненный ответ для повторного POST-запроса с тем же Idempotency-Key.
+
+    Поддерживаются только JSON-запросы: потоковые тела (NDJSON, text/plain) читаются
+    построчно и не должны буферизоваться целиком ради отпечатка. Ключ с телом другого
+    типа отклоняется, чтобы клиент не рассчитывал на защиту от повторов, которой нет.
+    """
+    key = request.headers.get('Idempotency-Key')
+    if request.method != 'POST' or not key:
+        return None
+    if not request.is_json:
+        return jsonify({'error': 'Idempotency-Key поддерживается только для тел application/json'}), 400
+
+    idempotency_cache.max_entries = app.config['IDEMPOTENCY_MAX_ENTRIES']
+    idempotency_cache.ttl = app.config['IDEMPOTENCY_TTL']
+
+    scoped_key = f'{request.path}:{key}'
+    fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+    state, cached = idempotency_cache.begin(scoped_key, fingerprint)
+
+    if state == IdempotencyCache.REPLAY:
+        response = app.response_class(cached.body, status=cached.status, headers=cached.headers)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response
+    if state == IdempotencyCache.IN_PROGRESS:
+        return jsonify({'error': 'Запрос с этим Idempotency-Key уже выполняется'}), 409
+    if state == IdempotencyCache.MISMATCH:
+        return jsonify({'error': 'Idempotency-Key уже использован с другими параметрами'}), 422
+
+    g.idempotency = (scoped_key, fingerprint)
+    return None
+
+
+@app.after_request
+def store_idempotent_response(response):
+    """Сохранить ответ на POST-запрос с Idempotency-Key для последующих повторов."""
+    idempotency = g.pop('idempotency', None)
+    if idempotency is not None:
+        scoped_key, fingerprint = idempotency
+        if response.status_code < 500 and not response.is_streamed:
+            cached = CachedResponse(
+                fingerprint, response.status_code, list(response.headers.items()), response.get_data()
+            )
+            idempotency_cache.store(scoped_key, cached)
+        else:
+            idempotency_cache.release(scoped_key)
+    return response
+
+
+@app.teardown_request
+def release_idempotency_key(error):
+    """Освободить Idempotency-Key, если ответ так и не был сохранен."""
+    idempotency = g.pop('idempotency', None)
+    if idempotency is not None:
+        idempotency_cache.release(idempotency[0])
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Проверка работоспособности API."""
-    return jsonify({'status': 'ok', 'message': 'Калькулятор работает'})
+    """Проверка работоспособности API (liveness)."""
+    _configure_admission()
+    return jsonify({'status': 'ok', 'message': 'Калькулятор работает', 'ready': admission.ready})
+
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Проверка готовности принимать запросы (readiness)."""
+    _configure_admission()
+    stats = admission.stats()
+    if not admission.ready:
+        response = jsonify({'status': 'overloaded', **stats})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(app.config['RETRY_AFTER'])
+        return response
+    return jsonify({'status': 'ready', **stats})
 
 
 @app.route('/api/add', methods=['POST'])
@@ -25,9 +247,11 @@ def add():
         if not data or 'a' not in data or 'b' not in data:
             return jsonify({'error': 'Требуются параметры a и b'}), 400
 
-        a = float(data['a'])
-        b = float(data['b'])
-        result = calculator.add(a, b)
+        with server_timing.phase('validate'):
+            a = float(data['a'])
+            b = float(data['b'])
+        with server_timing.phase('compute'):
+            result = calculator.add(a, b)
 
         return jsonify({'operation': 'add', 'a': a, 'b': b, 'result': result})
     except ValueError as e:
@@ -44,9 +268,11 @@ def subtract():
         if not data or 'a' not in data or 'b' not in data:
             return jsonify({'error': 'Требуются параметры a и b'}), 400
 
-        a = float(data['a'])
-        b = float(data['b'])
-        result = calculator.subtract(a, b)
+        with server_timing.phase('validate'):
+            a = float(data['a'])
+            b = float(data['b'])
+        with server_timing.phase('compute'):
+            result = calculator.subtract(a, b)
 
         return jsonify({'operation': 'subtract', 'a': a, 'b': b, 'result': result})
     except ValueError as e:
@@ -63,9 +289,11 @@ def multiply():
         if not data or 'a' not in data or 'b' not in data:
             return jsonify({'error': 'Требуются параметры a и b'}), 400
 
-        a = float(data['a'])
-        b = float(data['b'])
-        result = calculator.multiply(a, b)
+        with server_timing.phase('validate'):
+            a = float(data['a'])
+            b = float(data['b'])
+        with server_timing.phase('compute'):
+            result = calculator.multiply(a, b)
 
         return jsonify({'operation': 'multiply', 'a': a, 'b': b, 'result': result})
     except ValueError as e:
@@ -82,9 +310,11 @@ def divide():
         if not data or 'a' not in data or 'b' not in data:
             return jsonify({'error': 'Требуются параметры a и b'}), 400
 
-        a = float(data['a'])
-        b = float(data['b'])
-        result = calculator.divide(a, b)
+        with server_timing.phase('validate'):
+            a = float(data['a'])
+            b = float(data['b'])
+        with server_timing.phase('compute'):
+            result = calculator.divide(a, b)
 
         return jsonify({'operation': 'divide', 'a': a, 'b': b, 'result': result})
     except ValueError as e:
@@ -101,16 +331,17 @@ def round_number():
         if not data or 'value' not in data or 'precision' not in data:
             return jsonify({'error': 'Требуются параметры value и precision'}), 400
 
-        value = float(data['value'])
-        precision = float(data['precision'])
-        method = data.get('method', 'auto')
+        with server_timing.phase('validate'):
+            value = float(data['value'])
+            precision = float(data['precision'])
+            method = data.get('method', 'auto')
 
         # Валидация метода
-        valid_methods = ['auto', 'up', 'down', 'banker', 'truncate']
-        if method not in valid_methods:
-            return jsonify({'error': f'Неподдерживаемый метод. Доступны: {", ".join(valid_methods)}'}), 400
+        if method not in ROUND_METHODS:
+            return jsonify({'error': f'Неподдерживаемый метод. Доступны: {", ".join(ROUND_METHODS)}'}), 400
 
-        result = calculator.round_number(value, precision, method)
+        with server_timing.phase('compute'):
+            result = calculator.round_number(value, precision, method)
 
         return jsonify(
             {'operation': 'round', 'value': value, 'precision': precision, 'method': method, 'result': result}
@@ -121,73 +352,323 @@ def round_number():
         return jsonify({'error': f'Внутренняя ошибка: {str(e)}'}), 500
 
 
+# Фильтры истории в query string и функции приведения их значений
+_history_filters = {
+    'operation': str,
+    'method': str,
+    'min_result': float,
+    'max_result': float,
+    'since': float,
+    'until': float,
+}
+
+
 @app.route('/api/history', methods=['GET'])
 def get_history():
-    """API endpoint для получения истории вычислений."""
+    """API endpoint для получения истории вычислений.
+
+    Поддерживает фильтры operation, method, min_result, max_result, since и until
+    (время в секундах Unix), которые обрабатываются по индексам истории.
+
+    Поддерживает условные запросы: ETag строится из версии истории, и при совпадении
+    If-None-Match возвращается 304 без обращения к данным. Сериализованное тело
+    истории без фильтров кэшируется до следующего изменения истории.
+    """
+    global _history_cache
     try:
-        history = calculator.get_history()
-        return jsonify({'history': [{'operation': op, 'result': res} for op, res in history], 'count': len(history)})
+        with server_timing.phase('validate'):
+            filters = {
+                name: convert(request.args[name]) for name, convert in _history_filters.items() if name in request.args
+            }
+
+        version = calculator.history_version
+        etag = f'{_history_etag_prefix}-{version}'
+        if filters:
+            etag += '-' + hashlib.sha256(repr(sorted(filters.items())).encode('utf-8')).hexdigest()[:16]
+
+        if request.if_none_match.contains_weak(etag):
+            # Возвращаем валидатор в том виде, в каком клиент получил его с ответом 200:
+            # слабым, если тот ответ был сжат, и сильным, если нет
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=not request.if_none_match.contains(etag))
+            return response
+
+        cached_version, body = _history_cache
+        if filters or cached_version != version:
+            with server_timing.phase('compute'):
+                history = calculator.get_history(**filters)
+            body = app.json.dumps(
+                {'history': [{'operation': op, 'result': res} for op, res in history], 'count': len(history)}
+            )
+            if not filters:
+                _history_cache = (version, body)
+
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        return response
+    except ValueError as e:
+        return jsonify({'error': f'Некорректный фильтр: {str(e)}'}), 400
     except Exception as e:
         return jsonify({'error': f'Внутренняя ошибка: {str(e)}'}), 500
 
 
+def _chunked(lines, chunk_size):
+    """Склеить строки в порции примерно по chunk_size байт."""
+    chunk = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        chunk.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+@app.route('/api/history/export', methods=['GET'])
+def export_history():
+    """API endpoint для потоковой выгрузки истории в формате ndjson или csv.
+
+    Порции сжимаются по мере выгрузки в compress_response, если клиент принимает сжатие.
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        lines = calculator.iter_history_export(export_format)
+        chunks = _chunked(lines, app.config['STREAM_CHUNK_SIZE'])
+
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        response = app.response_class(chunks, mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename=history.{export_format}'
+        return response
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Внутренняя ошибка: {str(e)}'}), 500
+
+
+def _history_event(number, operation, result):
+    """Сформировать событие Server-Sent Events для записи истории."""
+    data = json.dumps({'operation': operation, 'result': result}, ensure_ascii=False)
+    return f'id: {_history_etag_prefix}-{number}\nevent: history\ndata: {data}\n\n'
+
+
+@app.route('/api/history/stream', methods=['GET'])
+def stream_history():
+    """API endpoint для получения новых записей истории через Server-Sent Events.
+
+    Идентификатор события — префикс процесса и сквозной номер записи, который не
+    сбрасывается при очистке истории. С заголовком Last-Event-ID сначала досылаются
+    записи после указанной; если идентификатор выдан другим процессом (например,
+    до перезапуска), досылается вся история. Если подписчик не успевает читать,
+    поток закрывается, и клиент переподключается с Last-Event-ID.
+    """
+    last_event_id = request.headers.get('Last-Event-ID')
+    if last_event_id is not None:
+        prefix, _, number = last_event_id.rpartition('-')
+        try:
+            last_event_id = int(number) if prefix == _history_etag_prefix else 0
+        except ValueError:
+            return jsonify({'error': 'Некорректный Last-Event-ID'}), 400
+
+    subscription = calculator.subscribe(app.config['SSE_BUFFER_SIZE'])
+    keepalive = app.config['SSE_KEEPALIVE']
+
+    def generate():
+        try:
+            if last_event_id is not None:
+                for entry in subscription.replay(last_event_id):
+                    yield _history_event(*entry)
+
+            while True:
+                entry = subscription.get(timeout=0 if subscription.dropped else keepalive)
+                if entry is not None:
+                    yield _history_event(*entry)
+                elif subscription.dropped:
+                    break
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            calculator.unsubscribe(subscription)
+
+    response = app.response_class(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @app.route('/api/history', methods=['DELETE'])
 def clear_history():
     """API endpoint для очистки истории вычислений."""
     try:
-        calculator.clear_history()
+        with server_timing.phase('compute'):
+            calculator.clear_history()
         return jsonify({'message': 'История очищена'})
     except Exception as e:
         return jsonify({'error': f'Внутренняя ошибка: {str(e)}'}), 500
 
 
-@app.route('/api/calculate', methods=['POST'])
-def calculate():
-    """Универсальный API endpoint для всех операций."""
-    try:
-        data = request.get_json()
-        operation = data['operation'].lower() if data and 'operation' in data else None
+def _calculate(data):
+    """Выполнить операцию из словаря параметров универсального endpoint.
+
+    Возвращает словарь ответа, при некорректных параметрах бросает ValueError.
+    """
+    operation = data['operation'].lower() if data and 'operation' in data else None
 
-        # Для операции round нужны параметры value, precision и опционально method
-        if operation == 'round':
-            if not data or 'value' not in data or 'precision' not in data:
-                return jsonify({'error': 'Требуются параметры operation, value и precision'}), 400
+    # Для операции round нужны параметры value, precision и опционально method
+    if operation == 'round':
+        if not data or 'value' not in data or 'precision' not in data:
+            raise ValueError('Требуются параметры operation, value и precision')
+        with server_timing.phase('validate'):
             value = float(data['value'])
             precision = float(data['precision'])
             method = data.get('method', 'auto')
 
-            # Валидация метода
-            valid_methods = ['auto', 'up', 'down', 'banker', 'truncate']
-            if method not in valid_methods:
-                return jsonify({'error': f'Неподдерживаемый метод. Доступны: {", ".join(valid_methods)}'}), 400
+        # Валидация метода
+        if method not in ROUND_METHODS:
+            raise ValueError(f'Неподдерживаемый метод. Доступны: {", ".join(ROUND_METHODS)}')
 
+        with server_timing.phase('compute'):
             result = calculator.round_number(value, precision, method)
-            return jsonify(
-                {'operation': operation, 'value': value, 'precision': precision, 'method': method, 'result': result}
-            )
+        return {'operation': operation, 'value': value, 'precision': precision, 'method': method, 'result': result}
 
-        # Для остальных операций нужны параметры a и b
-        if not data or 'operation' not in data or 'a' not in data or 'b' not in data:
-            return jsonify({'error': 'Требуются параметры operation, a и b'}), 400
+    # Для остальных операций нужны параметры a и b
+    if not data or 'operation' not in data or 'a' not in data or 'b' not in data:
+        raise ValueError('Требуются параметры operation, a и b')
 
+    with server_timing.phase('validate'):
         a = float(data['a'])
         b = float(data['b'])
 
-        if operation == 'add':
-            result = calculator.add(a, b)
-        elif operation == 'subtract':
-            result = calculator.subtract(a, b)
-        elif operation == 'multiply':
-            result = calculator.multiply(a, b)
-        elif operation == 'divide':
-            result = calculator.divide(a, b)
+    if operation not in ('add', 'subtract', 'multiply', 'divide'):
+        raise ValueError('Неподдерживаемая операция. Доступны: add, subtract, multiply, divide, round')
+
+    with server_timing.phase('compute'):
+        result = getattr(calculator, operation)(a, b)
+
+    return {'operation': operation, 'a': a, 'b': b, 'result': result}
+
+
+@app.route('/api/calculate', methods=['POST'])
+def calculate():
+    """Универсальный API endpoint для всех операций."""
+    try:
+        data = request.get_json()
+        return jsonify(_calculate(data))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Внутренняя ошибка: {str(e)}'}), 500
+
+
+@app.route('/api/stream', methods=['POST'])
+def stream_calculate():
+    """API endpoint для потока операций в формате NDJSON.
+
+    Тело запроса читается построчно: каждая строка — JSON с параметрами как у
+    /api/calculate. На каждую непустую строку сразу возвращается строка с результатом
+    или ошибкой. Операции потока сохраняются в файл раз в STREAM_HISTORY_FLUSH строк
+    или STREAM_HISTORY_FLUSH_INTERVAL секунд; операции других клиентов сохраняются сразу.
+    """
+    flush_every = app.config['STREAM_HISTORY_FLUSH']
+    flush_interval = app.config['STREAM_HISTORY_FLUSH_INTERVAL']
+
+    def generate():
+        last_flush = time.monotonic()
+        with calculator.deferred_history():
+            for number, line in enumerate(request.stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    result = _calculate(json.loads(line))
+                except (ValueError, TypeError) as e:
+                    result = {'line': number, 'error': str(e)}
+                except Exception as e:
+                    # Ошибка в одной строке не должна обрывать весь поток
+                    result = {'line': number, 'error': f'Внутренняя ошибка: {str(e)}'}
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+                if number % flush_every == 0 or time.monotonic() - last_flush >= flush_interval:
+                    calculator.flush_history()
+                    last_flush = time.monotonic()
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/api/reduce', methods=['POST'])
+def reduce_values():
+    """API endpoint для свертки массива чисел (sum, product, mean, min, max).
+
+    JSON-тело: {"op": "sum", "values": [...]}. Для очень больших массивов тело можно
+    передать потоком (text/plain или application/x-ndjson, по числу на строку) с
+    операцией в query string: /api/reduce?op=sum. Такое тело читается построчно
+    и целиком в памяти не хранится; при ошибке в ответе указывается номер строки.
+    """
+    bad_line = None
+    try:
+        if request.is_json:
+            data = request.get_json()
+            if not data or 'op' not in data or 'values' not in data:
+                return jsonify({'error': 'Требуются параметры op и values'}), 400
+            op = data['op']
+            values = data['values']
+            if not isinstance(values, list):
+                return jsonify({'error': 'values должен быть массивом чисел'}), 400
+            count = len(values)
         else:
-            return (
-                jsonify({'error': 'Неподдерживаемая операция. Доступны: add, subtract, multiply, divide, round'}),
-                400,
-            )
+            op = request.args.get('op')
+            if op is None:
+                return jsonify({'error': 'Требуется параметр op'}), 400
+            count = 0
+
+            def stream_values():
+                nonlocal count, bad_line
+                for number, line in enumerate(request.stream, 1):
+                    text = line.decode('utf-8', 'replace').strip()
+                    if not text:
+                        continue
+                    try:
+                        value = float(text)
+                    except ValueError:
+                        bad_line = number
+                        raise ValueError(f'Некорректное число: {text}') from None
+                    count += 1
+                    yield value
+
+            values = stream_values()
+
+        with server_timing.phase('compute'):
+            result = calculator.reduce(values, op)
+        return jsonify({'operation': op, 'count': count, 'result': result})
+    except ValueError as e:
+        if bad_line is not None:
+            return jsonify({'line': bad_line, 'error': str(e)}), 400
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Внутренняя ошибка: {str(e)}'}), 500
+
+
+@app.route('/api/bulk', methods=['POST'])
+def bulk_calculate():
+    """API endpoint для массовых операций в бинарном формате (application/octet-stream).
+
+    Тело — заголовок с операцией, precision и методом и массивы float64 little-endian
+    (см. binary_format). Массивы читаются прямо из буфера запроса без копирования,
+    результат возвращается в том же формате.
+    """
+    try:
+        if request.mimetype != binary_format.CONTENT_TYPE:
+            return jsonify({'error': f'Требуется тело {binary_format.CONTENT_TYPE}'}), 415
+
+        with server_timing.phase('parse'):
+            operation, precision, method, a, b = binary_format.unpack_request(request.get_data())
+        with server_timing.phase('compute'):
+            results = calculator.bulk(operation, a, b, precision, method)
+        with server_timing.phase('serialize'):
+            body = binary_format.pack_response(operation, results, precision, method)
 
-        return jsonify({'operation': operation, 'a': a, 'b': b, 'result': result})
+        return app.response_class(body, mimetype=binary_format.CONTENT_TYPE)
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
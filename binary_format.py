@@ -0,0 +1,131 @@
+"""
+Бинарный формат массовых операций: заголовок и массивы float64 little-endian.
+
+Запрос:  заголовок + a[count] (+ b[count] для add, subtract, multiply, divide)
+Ответ:   заголовок + result[count]
+
+Заголовок (24 байта, little-endian): сигнатура b'CALC', версия формата, код операции,
+код метода округления, резерв, precision (float64), count (uint32), выравнивание.
+"""
+
+from array import array
+from typing import Iterable, Optional, Sequence, Tuple
+import struct
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него массивы читаются через memoryview/array
+    np = None
+
+CONTENT_TYPE = 'application/octet-stream'
+
+MAGIC = b'CALC'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBdI4x')
+
+OPERATIONS = ('add', 'subtract', 'multiply', 'divide', 'round')
+METHODS = ('auto', 'up', 'down', 'banker', 'truncate')
+
+# Операции с двумя массивами операндов
+BINARY_OPERATIONS = ('add', 'subtract', 'multiply', 'divide')
+
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def pack_header(operation: str, count: int, precision: float = 0.0, method: str = 'auto') -> bytes:
+    """Упаковать заголовок."""
+    if operation not in OPERATIONS:
+        raise ValueError(f"Неподдерживаемая операция. Доступны: {', '.join(OPERATIONS)}")
+    if method not in METHODS:
+        raise ValueError(f"Неподдерживаемый метод. Доступны: {', '.join(METHODS)}")
+    return HEADER.pack(MAGIC, VERSION, OPERATIONS.index(operation), METHODS.index(method), 0, precision, count)
+
+
+def unpack_header(data) -> Tuple[str, int, float, str]:
+    """Распаковать заголовок: (операция, count, precision, метод)."""
+    if len(data) < HEADER.size:
+        raise ValueError("Тело короче заголовка бинарного формата")
+    magic, version, operation, method, _, precision, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Неизвестная сигнатура или версия бинарного формата")
+    if operation >= len(OPERATIONS) or method >= len(METHODS):
+        raise ValueError("Неизвестный код операции или метода")
+    return OPERATIONS[operation], count, precision, METHODS[method]
+
+
+def pack_floats(values: Iterable[float]) -> bytes:
+    """Упаковать числа в массив float64 little-endian."""
+    if np is not None and isinstance(values, np.ndarray):
+        return values.astype('<f8', copy=False).tobytes()
+    packed = values if isinstance(values, array) and values.typecode == 'd' else array('d', values)
+    if not _LITTLE_ENDIAN:
+        packed = array('d', packed)
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def view_floats(data, offset: int, count: int) -> Sequence[float]:
+    """Представить count чисел float64 little-endian из data начиная с offset.
+
+    С NumPy и на little-endian платформах числа не копируются: возвращается
+    представление поверх исходного буфера.
+    """
+    end = offset + count * 8
+    if len(data) < end:
+        raise ValueError("Длина тела не соответствует числу значений в заголовке")
+    if np is not None:
+        return np.frombuffer(data, dtype='<f8', count=count, offset=offset)
+    if _LITTLE_ENDIAN:
+        return memoryview(data)[offset:end].cast('d')
+    values = array('d', bytes(data[offset:end]))
+    values.byteswap()
+    return values
+
+
+def pack_request(
+    operation: str,
+    a: Iterable[float],
+    b: Optional[Iterable[float]] = None,
+    precision: float = 0.0,
+    method: str = 'auto',
+) -> bytes:
+    """Упаковать запрос массовой операции."""
+    a_bytes = pack_floats(a)
+    parts = [pack_header(operation, len(a_bytes) // 8, precision, method), a_bytes]
+    if operation in BINARY_OPERATIONS:
+        if b is None:
+            raise ValueError(f"{operation} требует два массива")
+        b_bytes = pack_floats(b)
+        if len(b_bytes) != len(a_bytes):
+            raise ValueError("Массивы a и b должны быть одной длины")
+        parts.append(b_bytes)
+    return b''.join(parts)
+
+
+def _check_length(data, arrays: int, count: int) -> None:
+    """Проверить, что после заголовка ровно arrays массивов по count чисел."""
+    if len(data) != HEADER.size + arrays * count * 8:
+        raise ValueError("Длина тела не соответствует числу значений в заголовке")
+
+
+def unpack_request(data) -> Tuple[str, float, str, Sequence[float], Optional[Sequence[float]]]:
+    """Распаковать запрос: (операция, precision, метод, a, b) без копирования массивов."""
+    operation, count, precision, method = unpack_header(data)
+    _check_length(data, 2 if operation in BINARY_OPERATIONS else 1, count)
+    a = view_floats(data, HEADER.size, count)
+    b = view_floats(data, HEADER.size + count * 8, count) if operation in BINARY_OPERATIONS else None
+    return operation, precision, method, a, b
+
+
+def pack_response(operation: str, results, precision: float = 0.0, method: str = 'auto') -> bytes:
+    """Упаковать ответ массовой операции."""
+    body = pack_floats(results)
+    return pack_header(operation, len(body) // 8, precision, method) + body
+
+
+def unpack_response(data) -> Sequence[float]:
+    """Распаковать ответ массовой операции в последовательность результатов."""
+    _, count, _, _ = unpack_header(data)
+    _check_length(data, 1, count)
+    return view_floats(data, HEADER.size, count)
@@ -2,17 +2,259 @@
 Простой калькулятор с базовыми математическими операциями и историей вычислений.
 """
 
-from typing import List, Tuple
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import bisect
+import csv
+import io
+import itertools
 import json
+import math
+import operator
 import os
+import queue
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него свертка считается на чистом Python
+    np = None
+
+# Форматы выгрузки истории
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# Методы округления
+ROUND_METHODS = ('auto', 'up', 'down', 'banker', 'truncate')
+
+# Операции свертки массива
+REDUCE_OPERATIONS = ('sum', 'product', 'mean', 'min', 'max')
+
+# Поэлементные операции над двумя массивами
+_BULK_OPERATORS = {
+    'add': operator.add,
+    'subtract': operator.sub,
+    'multiply': operator.mul,
+    'divide': operator.truediv,
+}
+
+# Операторы в записях истории вида "a + b"
+_HISTORY_OPERATORS = {'+': 'add', '-': 'subtract', '*': 'multiply', '/': 'divide'}
+
+
+def _classify_operation(operation: str) -> Tuple[str, Optional[str]]:
+    """Определить тип операции и метод округления по строке записи истории."""
+    parts = operation.split(' ')
+    if len(parts) == 3 and parts[1] in _HISTORY_OPERATORS:
+        return _HISTORY_OPERATORS[parts[1]], None
+    kind = operation.split('(', 1)[0]
+    if kind == 'round':
+        # Формат: round(value, precision, method) -> интерпретация
+        return kind, operation.split(') -> ', 1)[0].rsplit(', ', 1)[-1]
+    return kind, None
+
+
+def _to_number(value) -> float:
+    """Преобразовать элемент массива в число или бросить ValueError."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Некорректное значение в массиве: {value!r}") from None
+
+
+class HistoryIndex:
+    """Вторичные индексы истории для фильтрации без полного просмотра.
+
+    Позиции записей хранятся в порядке добавления, поэтому списки по типу операции
+    и методу округления отсортированы сами собой. Метки времени не убывают, и
+    диапазон по времени ищется бинарным поиском прямо по ним.
+
+    Пары (результат, позиция) хранятся в двух отсортированных списках: большом
+    основном и небольшом списке последних записей. Новая пара вставляется только
+    в малый список, а в основной он вливается, когда вырастает больше √n, поэтому
+    и добавление, и запрос по диапазону результата не перебирают всю историю.
+    """
+
+    # Минимальный размер списка последних результатов перед слиянием с основным
+    MIN_RECENT_RESULTS = 64
+
+    def __init__(self, entries: Iterable[Tuple[str, float]] = (), timestamps: Optional[List[float]] = None):
+        self.timestamps: List[float] = []
+        self.by_operation: Dict[str, List[int]] = {}
+        self.by_method: Dict[str, List[int]] = {}
+        self._results: List[Tuple[float, int]] = []
+        self._recent_results: List[Tuple[float, int]] = []
+        for position, (operation, result) in enumerate(entries):
+            pair = self._index_entry(operation, result, timestamps[position] if timestamps else 0.0)
+            if pair is not None:
+                self._results.append(pair)
+        self._results.sort()
+
+    def add(self, operation: str, result: float, timestamp: float) -> None:
+        """Проиндексировать следующую запись истории."""
+        pair = self._index_entry(operation, result, timestamp)
+        if pair is None:
+            return
+        bisect.insort(self._recent_results, pair)
+        if len(self._recent_results) > max(self.MIN_RECENT_RESULTS, math.isqrt(len(self._results))):
+            # Слияние двух отсортированных списков — один проход Timsort
+            self._results += self._recent_results
+            self._results.sort()
+            self._recent_results = []
+
+    def result_count(self, min_result: Optional[float], max_result: Optional[float]) -> int:
+        """Число записей с результатом в диапазоне [min_result, max_result]."""
+        return sum(right - left for _, left, right in self._result_slices(min_result, max_result))
+
+    def result_positions(self, min_result: Optional[float], max_result: Optional[float]) -> List[int]:
+        """Отсортированные позиции записей с результатом в диапазоне [min_result, max_result]."""
+        return sorted(
+            position
+            for results, left, right in self._result_slices(min_result, max_result)
+            for _, position in results[left:right]
+        )
+
+    def _index_entry(self, operation: str, result: float, timestamp: float) -> Optional[Tuple[float, int]]:
+        """Добавить запись во все индексы, кроме индекса результатов, и вернуть ее пару для него."""
+        position = len(self.timestamps)
+        if self.timestamps:
+            timestamp = max(timestamp, self.timestamps[-1])
+        self.timestamps.append(timestamp)
+
+        kind, method = _classify_operation(operation)
+        self.by_operation.setdefault(kind, []).append(position)
+        if method is not None:
+            self.by_method.setdefault(method, []).append(position)
+        if result != result:  # NaN не попадает ни в один диапазон
+            return None
+        return result, position
+
+    def _result_slices(
+        self, min_result: Optional[float], max_result: Optional[float]
+    ) -> Iterator[Tuple[List[Tuple[float, int]], int, int]]:
+        """Границы диапазона результата в каждом из отсортированных списков."""
+        for results in (self._results, self._recent_results):
+            left = 0 if min_result is None else bisect.bisect_left(results, (min_result, -1))
+            right = len(results) if max_result is None else bisect.bisect_right(results, (max_result, math.inf))
+            yield results, left, right
+
+
+class HistorySnapshot(Sequence):
+    """Неизменяемый снимок истории на момент получения.
+
+    История только дописывается в конец, а очистка заменяет список целиком, поэтому
+    снимок — это ссылка на список и его длина: он получается за O(1), не копирует
+    записи и не видит записей, добавленных позже.
+    """
+
+    __slots__ = ('_entries', '_length')
+
+    def __init__(self, entries: List[Tuple[str, float]], length: int):
+        self._entries = entries
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entries[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Индекс вне снимка истории")
+        return self._entries[index]
+
+    def __iter__(self) -> Iterator[Tuple[str, float]]:
+        return itertools.islice(self._entries, self._length)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (HistorySnapshot, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"HistorySnapshot({list(self)!r})"
+
+
+class HistorySubscription:
+    """Подписка на новые записи истории с ограниченным буфером.
+
+    Записи приходят в виде (номер, операция, результат). Номера записей сквозные:
+    они растут на протяжении жизни калькулятора и не начинаются заново после
+    clear_history. Если подписчик не успевает читать и буфер переполняется,
+    подписка помечается как dropped и новые записи в нее больше не попадают.
+    """
+
+    def __init__(self, snapshot: HistorySnapshot, first_id: int, max_buffered: int):
+        # Снимок истории на момент подписки и номер его первой записи:
+        # по ним можно дослать пропущенные записи
+        self.snapshot = snapshot
+        self.first_id = first_id
+        self.dropped = False
+        self._queue: "queue.Queue[Tuple[int, str, float]]" = queue.Queue(max_buffered)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[int, str, float]]:
+        """Получить следующую запись или None, если за timeout секунд записей не было."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def replay(self, last_id: int) -> Iterator[Tuple[int, str, float]]:
+        """Записи снимка с номерами больше last_id.
+
+        Если last_id старше первой записи снимка (история была очищена после него)
+        или новее последней, досылается весь снимок.
+        """
+        start = last_id - self.first_id + 1
+        if not 0 <= start <= len(self.snapshot):
+            start = 0
+        for position in range(start, len(self.snapshot)):
+            operation, result = self.snapshot[position]
+            yield self.first_id + position, operation, result
+
+    def _push(self, entry: Tuple[int, str, float]) -> bool:
+        """Положить запись в буфер. Возвращает False, если подписчик отстал."""
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped = True
+            return False
 
 
 class Calculator:
     """Калькулятор с базовыми математическими операциями."""
 
-    def __init__(self):
-        self.history_file = "calculator_history.json"
-        self.history = self._load_history()
+    def __init__(self, history_file: Optional[str] = "calculator_history.json"):
+        # history_file=None — история хранится только в памяти
+        self.history_file = history_file
+        self._history_version = 0
+        self._lock = threading.Lock()
+        # Отложенное сохранение действует только в потоке, открывшем deferred_history:
+        # операции других потоков (например, других клиентов API) сохраняются сразу
+        self._deferral = threading.local()
+        # Вызывается с названием фазы и длительностью в секундах (например, для Server-Timing)
+        self.timing_hook: Optional[Callable[[str, float], None]] = None
+        self._subscribers: List[HistorySubscription] = []
+        self._reset_history(*self._read_history_file())
+
+    @property
+    def history(self) -> List[Tuple[str, float]]:
+        """История вычислений."""
+        return self._history
+
+    @history.setter
+    def history(self, value: List[Tuple[str, float]]) -> None:
+        self._reset_history(value)
+
+    @property
+    def history_version(self) -> int:
+        """Монотонно возрастающий номер версии истории, меняется при каждом изменении."""
+        return self._history_version
 
     def add(self, a: float, b: float) -> float:
         """Сложение двух чисел."""
@@ -40,6 +282,74 @@ class Calculator:
         self._add_to_history(f"{a} / {b}", result)
         return result
 
+    def reduce(self, values: Iterable[float], op: str) -> float:
+        """Свертка массива чисел: sum, product, mean, min или max.
+
+        values может быть любым итерируемым объектом, в том числе генератором:
+        числа читаются по одному, и массив целиком в памяти не нужен. Сумма и
+        среднее считаются через math.fsum без потери точности. Для готовых
+        массивов product, min и max считаются через NumPy, если он установлен.
+        """
+        if op not in REDUCE_OPERATIONS:
+            raise ValueError(f"Неподдерживаемая операция. Доступны: {', '.join(REDUCE_OPERATIONS)}")
+
+        if np is not None and op in ('product', 'min', 'max') and isinstance(values, (list, tuple, np.ndarray)):
+            if isinstance(values, np.ndarray) and values.ndim == 1 and values.dtype.kind in 'biuf':
+                array = values.astype(np.float64, copy=False)
+            else:
+                # Элементы проверяются так же, как без NumPy: None и вложенные списки — ошибка, а не nan
+                array = np.fromiter(map(_to_number, values), dtype=np.float64, count=len(values))
+            count = len(array)
+            if count == 0 and op != 'product':
+                raise ValueError("Требуется хотя бы одно значение")
+            result = float({'product': np.prod, 'min': np.min, 'max': np.max}[op](array))
+        else:
+            count = 0
+
+            def numbers() -> Iterator[float]:
+                nonlocal count
+                for value in values:
+                    count += 1
+                    yield _to_number(value)
+
+            if op in ('sum', 'mean'):
+                result = math.fsum(numbers())
+            elif op == 'product':
+                result = float(math.prod(numbers()))
+            else:
+                result = {'min': min, 'max': max}[op](numbers(), default=None)
+            if op == 'mean' and count:
+                result /= count
+            if count == 0 and op in ('mean', 'min', 'max'):
+                raise ValueError("Требуется хотя бы одно значение")
+
+        self._add_to_history(f"{op}(n={count})", result)
+        return result
+
+    def bulk(self, operation: str, a, b=None, precision: float = 0.0, method: str = "auto"):
+        """Поэлементная операция над массивами чисел.
+
+        Для add, subtract, multiply и divide нужны массивы a и b одной длины, для round —
+        только a. Массивы NumPy обрабатываются векторно, остальные (list, array,
+        memoryview) — поэлементно. В историю массовые операции не записываются:
+        одного результата у них нет, а запись на каждый элемент свела бы выигрыш на нет.
+        """
+        if operation == 'round':
+            return array('d', (self._round_value(value, precision, method)[0] for value in a))
+        if operation not in _BULK_OPERATORS:
+            raise ValueError(f"Неподдерживаемая операция. Доступны: {', '.join(_BULK_OPERATORS)}, round")
+        if b is None or len(a) != len(b):
+            raise ValueError("Массивы a и b должны быть одной длины")
+
+        if np is not None and isinstance(a, np.ndarray) and isinstance(b, np.ndarray):
+            if operation == 'divide' and not b.all():
+                raise ValueError("Деление на ноль невозможно")
+            return _BULK_OPERATORS[operation](a, b)
+
+        if operation == 'divide' and any(value == 0 for value in b):
+            raise ValueError("Деление на ноль невозможно")
+        return array('d', map(_BULK_OPERATORS[operation], a, b))
+
     def round_number(self, value: float, precision: float, method: str = "auto") -> float:
         """
         Округление числа с неоднозначной логикой.
@@ -54,6 +364,18 @@ class Calculator:
         - Если value == 0: особые правила
         - Если precision очень большое: что делать?
         """
+        result, precision, method, interpretation = self._round_value(value, precision, method)
+
+        # Добавляем в историю с указанием метода и интерпретации
+        self._add_to_history(f"round({value}, {precision}, {method}) -> {interpretation}", result)
+        return result
+
+    @staticmethod
+    def _round_value(value: float, precision: float, method: str) -> Tuple[float, float, str, str]:
+        """Округлить число по правилам round_number без записи в историю.
+
+        Возвращает результат, фактически использованные precision и method и интерпретацию.
+        """
         import math
 
         # Обработка особых случаев
@@ -114,37 +436,214 @@ class Calculator:
                     result = round(value)
                 interpretation = "до целого"
 
-        # Добавляем в историю с указанием метода и интерпретации
-        self._add_to_history(f"round({value}, {precision}, {method}) -> {interpretation}", result)
-        return result
+        return result, precision, method, interpretation
+
+    def get_history(
+        self,
+        operation: Optional[str] = None,
+        method: Optional[str] = None,
+        min_result: Optional[float] = None,
+        max_result: Optional[float] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Sequence:
+        """Получить историю вычислений.
+
+        Без фильтров возвращает неизменяемый снимок истории (без копирования записей).
+        С фильтрами возвращает список подходящих записей; фильтры объединяются по И:
+        - operation: тип операции (add, subtract, multiply, divide, round)
+        - method: метод округления
+        - min_result, max_result: диапазон результата (включительно)
+        - since, until: диапазон времени записи в секундах Unix (включительно)
+        """
+        if all(f is None for f in (operation, method, min_result, max_result, since, until)):
+            # Длину берем у той же ссылки: clear_history заменяет список, а не очищает его
+            entries = self._history
+            return HistorySnapshot(entries, len(entries))
+
+        with self._lock:
+            entries, index = self._history, self._index
+            count = len(entries)
+
+            # Диапазон времени — непрерывный отрезок позиций
+            low = 0 if since is None else bisect.bisect_left(index.timestamps, since, 0, count)
+            high = count if until is None else bisect.bisect_right(index.timestamps, until, 0, count)
+            candidates = [range(low, high)]
 
-    def get_history(self) -> List[Tuple[str, float]]:
-        """Получить историю вычислений."""
-        return self.history.copy()
+            if operation is not None:
+                candidates.append(index.by_operation.get(operation, []))
+            if method is not None:
+                candidates.append(index.by_method.get(method, []))
+
+            # Перебираем самый короткий список, остальные проверяем бинарным поиском
+            candidates.sort(key=len)
+            driver, others = candidates[0], candidates[1:]
+
+            # Позиции диапазона результата собираем, только если он короче остальных;
+            # иначе результат проверяется прямо по записям
+            in_range = None
+            if min_result is not None or max_result is not None:
+                if index.result_count(min_result, max_result) < len(driver):
+                    others.append(driver)
+                    driver = index.result_positions(min_result, max_result)
+                else:
+                    low_result = -math.inf if min_result is None else min_result
+                    high_result = math.inf if max_result is None else max_result
+
+                    def in_range(position: int) -> bool:
+                        return low_result <= entries[position][1] <= high_result
+
+            return [
+                entries[position]
+                for position in driver
+                if position < count
+                and all(self._contains(other, position) for other in others)
+                and (in_range is None or in_range(position))
+            ]
+
+    def iter_history_export(self, format: str = 'ndjson') -> Iterator[str]:
+        """Построчно выгрузить историю в формате ndjson или csv.
+
+        Строки формируются по одной, поэтому память не зависит от размера истории.
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Неподдерживаемый формат. Доступны: {', '.join(EXPORT_FORMATS)}")
+        history = self.get_history()
+        if format == 'csv':
+            return self._iter_csv_lines(history)
+        return (json.dumps({'operation': op, 'result': res}, ensure_ascii=False) + '\n' for op, res in history)
+
+    def export_history(self, fileobj: IO[str], format: str = 'ndjson') -> None:
+        """Выгрузить историю в текстовый файловый объект в формате ndjson или csv."""
+        fileobj.writelines(self.iter_history_export(format))
+
+    def subscribe(self, max_buffered: int = 256) -> HistorySubscription:
+        """Подписаться на новые записи истории."""
+        with self._lock:
+            subscription = HistorySubscription(self.get_history(), self._history_base + 1, max_buffered)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: HistorySubscription) -> None:
+        """Отменить подписку на новые записи истории."""
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @contextmanager
+    def deferred_history(self) -> Iterator[None]:
+        """Отложить сохранение истории в файл до выхода из блока.
+
+        Внутри блока операции текущего потока только дописываются в память, а файл
+        перезаписывается один раз в конце (или при явном вызове flush_history).
+        Операции других потоков сохраняются как обычно.
+        """
+        deferral = self._deferral
+        deferral.depth = getattr(deferral, 'depth', 0) + 1
+        try:
+            yield
+        finally:
+            deferral.depth -= 1
+            if deferral.depth == 0:
+                self.flush_history()
+
+    def flush_history(self) -> None:
+        """Сохранить в файл отложенные изменения истории текущего потока."""
+        if getattr(self._deferral, 'dirty', False):
+            self._deferral.dirty = False
+            self._save_history()
+
+    def extend_history(self, entries: List[Tuple[str, float]]) -> None:
+        """Добавить в историю готовые записи (например, вычисленные в другом процессе)."""
+        with self.deferred_history():
+            for operation, result in entries:
+                self._add_to_history(operation, result)
 
     def clear_history(self) -> None:
         """Очистить историю вычислений."""
         self.history = []
         self._save_history()
 
+    def _reset_history(self, entries: List[Tuple[str, float]], timestamps: Optional[List[float]] = None) -> None:
+        """Заменить историю и перестроить ее индексы."""
+        index = HistoryIndex(entries, timestamps)
+        with self._lock:
+            # Номера записей сквозные: новая история продолжает нумерацию старой
+            previous = getattr(self, '_history', None)
+            self._history_base = self._history_base + len(previous) if previous is not None else 0
+            self._history = entries
+            self._index = index
+            self._history_version += 1
+
+    @staticmethod
+    def _contains(positions, position: int) -> bool:
+        """Проверить наличие позиции в отсортированной последовательности."""
+        i = bisect.bisect_left(positions, position)
+        return i < len(positions) and positions[i] == position
+
     def _add_to_history(self, operation: str, result: float) -> None:
-        """Добавить операцию в историю."""
-        self.history.append((operation, result))
-        self._save_history()
+        """Добавить операцию в историю и разослать ее подписчикам."""
+        with self._lock:
+            # Индекс обновляем до записи, чтобы видимая запись всегда была проиндексирована
+            self._index.add(operation, result, time.time())
+            self._history.append((operation, result))
+            self._history_version += 1
+            if self._subscribers:
+                entry = (self._history_base + len(self._history), operation, result)
+                self._subscribers = [s for s in self._subscribers if s._push(entry)]
+        if getattr(self._deferral, 'depth', 0) > 0:
+            self._deferral.dirty = True
+        else:
+            self._save_history()
+
+    @staticmethod
+    def _iter_csv_lines(history: HistorySnapshot) -> Iterator[str]:
+        """Построчно сформировать CSV с заголовком для снимка истории."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def format_row(row) -> str:
+            writer.writerow(row)
+            line = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return line
+
+        yield format_row(('operation', 'result'))
+        for row in history:
+            yield format_row(row)
 
     def _load_history(self) -> List[Tuple[str, float]]:
         """Загрузить историю из файла."""
-        if os.path.exists(self.history_file):
+        return self._read_history_file()[0]
+
+    def _read_history_file(self) -> Tuple[List[Tuple[str, float]], List[float]]:
+        """Прочитать из файла записи истории и их метки времени."""
+        if self.history_file is not None and os.path.exists(self.history_file):
             try:
                 with open(self.history_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    return [(item['operation'], item['result']) for item in data]
+                    entries = [(item['operation'], item['result']) for item in data]
+                    # В файлах старого формата меток времени нет
+                    timestamps = [item.get('timestamp', 0.0) for item in data]
+                    return entries, timestamps
             except (json.JSONDecodeError, KeyError):
-                return []
-        return []
+                return [], []
+        return [], []
 
     def _save_history(self) -> None:
         """Сохранить историю в файл."""
-        data = [{'operation': op, 'result': res} for op, res in self.history]
+        if self.history_file is None:
+            return
+        start = time.perf_counter()
+        with self._lock:
+            entries, index = self._history, self._index
+            count = len(entries)
+        data = [
+            {'operation': op, 'result': res, 'timestamp': index.timestamps[i]}
+            for i, (op, res) in enumerate(itertools.islice(entries, count))
+        ]
         with open(self.history_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        if self.timing_hook is not None:
+            self.timing_hook('persist', time.perf_counter() - start)
@@ -4,6 +4,8 @@
 
 import requests
 
+import binary_format
+
 
 class CalculatorClient:
     """Клиент для работы с API калькулятора."""
@@ -52,6 +54,28 @@ class CalculatorClient:
         response = requests.post(f"{self.base_url}/api/calculate", json=data)
         return response.json()
 
+    def bulk(self, operation, a, b):
+        """Массовая операция над массивами a и b в бинарном формате.
+
+        Возвращает последовательность результатов поверх буфера ответа, а при ошибке —
+        словарь с описанием ошибки.
+        """
+        body = binary_format.pack_request(operation, a, b)
+        return self._post_binary(body)
+
+    def bulk_round(self, values, precision, method="auto"):
+        """Массовое округление чисел в бинарном формате."""
+        body = binary_format.pack_request("round", values, precision=precision, method=method)
+        return self._post_binary(body)
+
+    def _post_binary(self, body):
+        """Отправить запрос в бинарном формате и распаковать ответ."""
+        headers = {"Content-Type": binary_format.CONTENT_TYPE}
+        response = requests.post(f"{self.base_url}/api/bulk", data=body, headers=headers)
+        if response.headers.get("Content-Type") != binary_format.CONTENT_TYPE:
+            return response.json()
+        return binary_format.unpack_response(response.content)
+
     def get_history(self):
         """Получить историю вычислений."""
         response = requests.get(f"{self.base_url}/api/history")
@@ -116,7 +140,14 @@ def demo():
     print(f"   Универсальный: 2 + 8 = {result['result']}")
 
     result = client.calculate("round", 3.14, 1)
-    print(f"   Универсальный: round(3.14, 1) = {result['result']}\n")
+    print(f"   Универсальный: round(3.14, 1) = {result['result']}")
+
+    # Массовые операции в бинарном формате
+    results = client.bulk("multiply", [1, 2, 3], [10, 20, 30])
+    print(f"   Массово: [1, 2, 3] * [10, 20, 30] = {list(results)}")
+
+    results = client.bulk_round([3.14159, 2.71828], 2, "down")
+    print(f"   Массово: round([3.14159, 2.71828], 2, down) = {list(results)}\n")
 
     # Просмотр истории
     print("3. История вычислений:")
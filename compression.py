@@ -0,0 +1,60 @@
+"""
+Сжатие ответов: выбор кодировки по Accept-Encoding, gzip, deflate и brotli.
+"""
+
+from typing import Iterable, Iterator, Optional
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него используются gzip и deflate
+    brotli = None
+
+# Кодировки в порядке предпочтения
+ENCODINGS = ('br', 'gzip', 'deflate') if brotli is not None else ('gzip', 'deflate')
+
+
+def negotiate(accept_encodings) -> Optional[str]:
+    """Выбрать кодировку из заголовка Accept-Encoding или None, если сжатие не принимается."""
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _compressor(encoding: str, level: int):
+    """Создать потоковый компрессор для кодировки."""
+    if encoding == 'gzip':
+        return zlib.compressobj(level, wbits=16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return zlib.compressobj(level, wbits=zlib.MAX_WBITS)
+    raise ValueError(f"Неподдерживаемая кодировка: {encoding}")
+
+
+def compress(data: bytes, encoding: str, level: int = 6) -> bytes:
+    """Сжать тело ответа целиком."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    compressor = _compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_chunks(chunks: Iterable[bytes], encoding: str, level: int = 6) -> Iterator[bytes]:
+    """Сжимать поток порций, сбрасывая компрессор после каждой, чтобы клиент мог читать сразу."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = _compressor(encoding, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,84 @@
+"""
+Кэш ответов для идемпотентных повторов запросов (заголовок Idempotency-Key).
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import threading
+import time
+
+
+class CachedResponse(NamedTuple):
+    """Сохраненный ответ на запрос с Idempotency-Key."""
+
+    fingerprint: str
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class IdempotencyCache:
+    """Ограниченный по размеру кэш ответов с вытеснением по TTL.
+
+    Ключ сначала резервируется через begin(), пока запрос выполняется, а затем
+    либо сохраняется через store(), либо освобождается через release().
+    """
+
+    # Результаты begin()
+    PROCEED = 'proceed'
+    REPLAY = 'replay'
+    IN_PROGRESS = 'in_progress'
+    MISMATCH = 'mismatch'
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, fingerprint: str) -> Tuple[str, Optional[CachedResponse]]:
+        """Найти сохраненный ответ или зарезервировать ключ для нового запроса."""
+        with self._lock:
+            self._evict_expired()
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached = entry[1]
+                if cached.fingerprint != fingerprint:
+                    return self.MISMATCH, None
+                return self.REPLAY, cached
+            if key in self._pending:
+                if self._pending[key] != fingerprint:
+                    return self.MISMATCH, None
+                return self.IN_PROGRESS, None
+            self._pending[key] = fingerprint
+            return self.PROCEED, None
+
+    def store(self, key: str, response: CachedResponse) -> None:
+        """Сохранить ответ для зарезервированного ключа."""
+        with self._lock:
+            self._pending.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def release(self, key: str) -> None:
+        """Снять резервирование ключа без сохранения ответа."""
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кэш."""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def _evict_expired(self) -> None:
+        """Удалить записи с истекшим TTL (TTL общий, поэтому они лежат в начале)."""
+        now = time.monotonic()
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
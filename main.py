@@ -1,8 +1,30 @@
 """
 CLI интерфейс для калькулятора.
+
+Без аргументов запускается интерактивное меню. С --batch операции читаются построчно
+из файла или stdin (-), а результаты пишутся в stdout по мере вычисления:
+
+    python main.py --batch in.txt
+    cat in.txt | python main.py --batch - --workers 4
+
+При чтении из stdin каждый результат выводится сразу после вычисления строки.
+
+Формат строки: "add 1 2", "divide 1 3", "round 3.14159 2 up" или выражение "1 + 2".
 """
 
-from calculator import Calculator
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+import argparse
+import multiprocessing
+import sys
+
+from calculator import ROUND_METHODS, Calculator
+
+# Операторы выражений вида "a + b"
+OPERATORS = {'+': 'add', '-': 'subtract', '*': 'multiply', '/': 'divide'}
+
+# Калькулятор процесса-обработчика пакетного режима
+_worker_calc: Optional[Calculator] = None
 
 
 def print_menu():
@@ -40,8 +62,164 @@ def show_history(calc: Calculator):
     print("=========================")
 
 
-def main():
+def evaluate_line(calc: Calculator, line: str) -> float:
+    """Вычислить одну строку пакетного режима."""
+    tokens = line.split()
+    if len(tokens) == 3 and tokens[1] in OPERATORS:
+        operation, args = OPERATORS[tokens[1]], [tokens[0], tokens[2]]
+    else:
+        operation, args = tokens[0].lower(), tokens[1:]
+
+    if operation == 'round':
+        if len(args) not in (2, 3):
+            raise ValueError("round требует value, precision и опционально method")
+        method = args[2] if len(args) == 3 else 'auto'
+        if method not in ROUND_METHODS:
+            raise ValueError(f"Неподдерживаемый метод. Доступны: {', '.join(ROUND_METHODS)}")
+        return calc.round_number(float(args[0]), float(args[1]), method)
+    if operation not in OPERATORS.values():
+        raise ValueError(f"Неизвестная операция: {tokens[0]}")
+    if len(args) != 2:
+        raise ValueError(f"{operation} требует два числа")
+    return getattr(calc, operation)(float(args[0]), float(args[1]))
+
+
+def _format_line(calc: Calculator, line: str) -> Optional[Tuple[str, bool]]:
+    """Вычислить строку и вернуть строку вывода и признак ошибки.
+
+    Для пустых строк и комментариев (#) возвращается None.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    try:
+        return f"{evaluate_line(calc, line)}\n", False
+    except (ValueError, ArithmeticError) as e:
+        return f"Ошибка: {e}\n", True
+
+
+def evaluate_lines(calc: Calculator, lines: Iterable[str]) -> Tuple[str, int]:
+    """Вычислить строки и вернуть вывод для них и число ошибок.
+
+    Пустые строки и комментарии (#) пропускаются, для остальных выводится
+    по одной строке: результат или сообщение об ошибке.
+    """
+    output = []
+    errors = 0
+    for line in lines:
+        formatted = _format_line(calc, line)
+        if formatted is not None:
+            output.append(formatted[0])
+            errors += formatted[1]
+    return ''.join(output), errors
+
+
+def _read_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    """Разбить поток строк на порции по chunk_size строк."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker() -> None:
+    """Создать калькулятор процесса-обработчика с историей только в памяти."""
+    global _worker_calc
+    _worker_calc = Calculator(history_file=None)
+
+
+def _evaluate_chunk(lines: List[str]) -> Tuple[str, int, List[Tuple[str, float]]]:
+    """Вычислить порцию строк в процессе-обработчике и вернуть записи истории."""
+    _worker_calc.history = []
+    output, errors = evaluate_lines(_worker_calc, lines)
+    return output, errors, _worker_calc.history
+
+
+def run_batch(
+    calc: Calculator,
+    source: TextIO,
+    out: TextIO,
+    workers: int = 1,
+    chunk_size: int = 10000,
+    line_buffered: bool = False,
+) -> int:
+    """Пакетно вычислить строки из source и вернуть код завершения.
+
+    История сохраняется в файл один раз в конце, а не после каждой операции.
+    При workers > 1 порции строк вычисляются в отдельных процессах, а вывод
+    остается в исходном порядке. С line_buffered вывод сбрасывается после
+    каждой строки (после каждой порции при workers > 1).
+    """
+    errors = 0
+    with calc.deferred_history():
+        if workers <= 1:
+            for line in source:
+                formatted = _format_line(calc, line)
+                if formatted is None:
+                    continue
+                out.write(formatted[0])
+                errors += formatted[1]
+                if line_buffered:
+                    out.flush()
+        else:
+            with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+                # Ограничиваем число порций в работе, чтобы не читать весь вход в память
+                pending = deque()
+                for chunk in _read_chunks(source, chunk_size):
+                    pending.append(pool.apply_async(_evaluate_chunk, (chunk,)))
+                    if len(pending) >= workers * 2:
+                        errors += _write_chunk_result(calc, out, pending.popleft().get(), line_buffered)
+                while pending:
+                    errors += _write_chunk_result(calc, out, pending.popleft().get(), line_buffered)
+    out.flush()
+    return 1 if errors else 0
+
+
+def _write_chunk_result(
+    calc: Calculator,
+    out: TextIO,
+    chunk_result: Tuple[str, int, List[Tuple[str, float]]],
+    flush: bool = False,
+) -> int:
+    """Записать вывод порции, добавить ее записи в историю и вернуть число ошибок."""
+    output, errors, entries = chunk_result
+    out.write(output)
+    if flush:
+        out.flush()
+    calc.extend_history(entries)
+    return errors
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разобрать аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Калькулятор")
+    parser.add_argument('--batch', metavar='FILE', help="пакетный режим: файл с операциями или - для stdin")
+    parser.add_argument('--workers', type=int, default=1, help="число процессов для пакетного режима")
+    parser.add_argument(
+        '--chunk-size', type=int, default=10000, help="строк в одной порции для процессов пакетного режима"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
     """Основная функция программы."""
+    args = parse_args(argv)
+    if args.batch is not None:
+        calc = Calculator()
+        if args.batch == '-':
+            return run_batch(calc, sys.stdin, sys.stdout, args.workers, args.chunk_size, line_buffered=True)
+        try:
+            source = open(args.batch, 'r', encoding='utf-8')
+        except OSError as e:
+            print(f"Ошибка: не удалось открыть {args.batch}: {e.strerror}", file=sys.stderr)
+            return 2
+        with source:
+            return run_batch(calc, source, sys.stdout, args.workers, args.chunk_size)
+
     calc = Calculator()
     
     print("Добро пожаловать в калькулятор!")
@@ -52,7 +230,7 @@ def main():
         
         if choice == "0":
             print("До свидания!")
-            break
+            return 0
         elif choice == "1":
             a = get_number("Введите первое число: ")
             b = get_number("Введите второе число: ")
@@ -86,4 +264,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Замеры фаз обработки запроса для заголовка Server-Timing.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import time
+
+from flask import g, has_app_context
+from flask.json.provider import DefaultJSONProvider
+
+
+def record(phase: str, seconds: float) -> None:
+    """Добавить длительность фазы к замерам текущего запроса."""
+    if has_app_context():
+        timings = g.setdefault('server_timing', {})
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Замерить длительность блока как фазу name текущего запроса."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def format_header(timings: Dict[str, float]) -> str:
+    """Сформировать значение заголовка Server-Timing (длительности в миллисекундах)."""
+    return ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in timings.items())
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON-провайдер, замеряющий разбор тела запроса и сериализацию ответа."""
+
+    def loads(self, s, **kwargs):
+        with phase('parse'):
+            return super().loads(s, **kwargs)
+
+    def dumps(self, obj, **kwargs):
+        with phase('serialize'):
+            return super().dumps(obj, **kwargs)
@@ -3,9 +3,14 @@
 """
 
 import pytest
+import gzip
 import json
+import zlib
 import tempfile
-from app import app, calculator
+from app import app, calculator, idempotency_cache
+from calculator import Calculator
+import app as app_module
+import binary_format
 
 
 @pytest.fixture
@@ -16,8 +21,9 @@ def client():
         app.config['TESTING'] = True
         calculator.history_file = temp_file.name
 
-        # Очищаем историю перед каждым тестом
+        # Очищаем историю и кэш идемпотентных ответов перед каждым тестом
         calculator.history = []
+        idempotency_cache.clear()
 
         with app.test_client() as client:
             yield client
@@ -34,6 +40,31 @@ class TestCalculatorAPI:
         assert data['status'] == 'ok'
         assert 'Калькулятор работает' in data['message']
 
+    def test_overload_rejected_with_retry_after(self, client, monkeypatch):
+        """Тест быстрого отказа при заполненной очереди."""
+        monkeypatch.setitem(app.config, 'MAX_ACTIVE_REQUESTS', 0)
+        monkeypatch.setitem(app.config, 'MAX_QUEUED_REQUESTS', 0)
+
+        response = client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+        assert response.status_code == 503
+        assert 'Retry-After' in response.headers
+        assert len(calculator.get_history()) == 0
+
+        # Liveness работает и под нагрузкой, readiness сообщает о перегрузке
+        response = client.get('/api/health')
+        assert response.status_code == 200
+        assert json.loads(response.data)['ready'] is False
+        response = client.get('/api/health/ready')
+        assert response.status_code == 503
+
+    def test_readiness_check(self, client):
+        """Тест проверки готовности."""
+        response = client.get('/api/health/ready')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['status'] == 'ready'
+        assert data['active'] == 0
+
     @pytest.mark.parametrize(
         "a,b,expected",
         [
@@ -223,6 +254,387 @@ class TestCalculatorAPI:
         assert data['count'] == 0
         assert len(data['history']) == 0
 
+    def test_history_etag_not_modified(self, client):
+        """Тест условного GET истории по ETag."""
+        client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+
+        response = client.get('/api/history')
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+
+        response = client.get('/api/history', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert response.data == b''
+
+    def test_history_etag_changes_after_operation(self, client):
+        """Тест смены ETag после изменения истории."""
+        response = client.get('/api/history')
+        etag = response.headers['ETag']
+
+        client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+
+        response = client.get('/api/history', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        data = json.loads(response.data)
+        assert data['count'] == 1
+
+    def test_idempotent_retry_returns_stored_response(self, client):
+        """Тест повтора запроса с тем же Idempotency-Key."""
+        headers = {'Idempotency-Key': 'retry-1'}
+        body = json.dumps({'a': 2, 'b': 3})
+
+        first = client.post('/api/add', data=body, content_type='application/json', headers=headers)
+        second = client.post('/api/add', data=body, content_type='application/json', headers=headers)
+
+        assert first.status_code == second.status_code == 200
+        assert json.loads(second.data) == json.loads(first.data)
+        assert second.headers['Idempotent-Replayed'] == 'true'
+        assert len(calculator.get_history()) == 1
+
+    def test_idempotency_ttl_from_config(self, client, monkeypatch):
+        """Тест применения IDEMPOTENCY_TTL, измененного после импорта приложения."""
+        monkeypatch.setitem(app.config, 'IDEMPOTENCY_TTL', 0)
+        headers = {'Idempotency-Key': 'retry-ttl'}
+        body = json.dumps({'a': 2, 'b': 3})
+
+        client.post('/api/add', data=body, content_type='application/json', headers=headers)
+        response = client.post('/api/add', data=body, content_type='application/json', headers=headers)
+
+        assert 'Idempotent-Replayed' not in response.headers
+        assert len(calculator.get_history()) == 2
+
+    def test_idempotency_key_reused_with_other_body(self, client):
+        """Тест повторного использования Idempotency-Key с другими параметрами."""
+        headers = {'Idempotency-Key': 'retry-2'}
+        client.post('/api/add', data=json.dumps({'a': 2, 'b': 3}), content_type='application/json', headers=headers)
+
+        response = client.post(
+            '/api/add', data=json.dumps({'a': 5, 'b': 5}), content_type='application/json', headers=headers
+        )
+        assert response.status_code == 422
+        assert len(calculator.get_history()) == 1
+
+    def test_history_export_ndjson_gzip(self, client):
+        """Тест потоковой выгрузки истории в ndjson со сжатием."""
+        client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+        client.post('/api/multiply', data=json.dumps({'a': 3, 'b': 4}), content_type='application/json')
+
+        response = client.get('/api/history/export?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        lines = gzip.decompress(response.data).decode('utf-8').splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {'operation': '1.0 + 2.0', 'result': 3.0},
+            {'operation': '3.0 * 4.0', 'result': 12.0},
+        ]
+
+    def test_history_export_csv(self, client):
+        """Тест выгрузки истории в csv без сжатия."""
+        client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+
+        response = client.get('/api/history/export?format=csv')
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert response.data.decode('utf-8').splitlines() == ['operation,result', '1.0 + 2.0,3.0']
+
+    def test_history_export_invalid_format(self, client):
+        """Тест неподдерживаемого формата выгрузки."""
+        response = client.get('/api/history/export?format=xml')
+        assert response.status_code == 400
+
+    @staticmethod
+    def _history_events(client, last_event_id, count):
+        """Прочитать count событий потока истории после last_event_id: [(id, data)]."""
+        response = client.get('/api/history/stream', headers={'Last-Event-ID': last_event_id}, buffered=False)
+        assert response.status_code == 200
+        events = iter(response.response)
+        result = []
+        for _ in range(count):
+            lines = next(events).decode('utf-8').splitlines()
+            result.append((lines[0][len('id: '):], json.loads(lines[2][len('data: '):])))
+        response.close()
+        return result
+
+    @staticmethod
+    def _event_number(event_id):
+        """Сквозной номер записи из идентификатора события вида "<префикс>-<номер>"."""
+        return int(event_id.rpartition('-')[2])
+
+    def test_history_stream_resumes_from_last_event_id(self, client):
+        """Тест досылки записей истории в потоке событий по Last-Event-ID."""
+        client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+        client.post('/api/multiply', data=json.dumps({'a': 3, 'b': 4}), content_type='application/json')
+        (first_id, _), (second_id, _) = self._history_events(client, '', 2)
+        prefix = first_id.rpartition('-')[0]
+        assert second_id == f'{prefix}-{self._event_number(first_id) + 1}'
+
+        response = client.get('/api/history/stream', headers={'Last-Event-ID': first_id}, buffered=False)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+
+        events = iter(response.response)
+        event = next(events)
+        assert event.startswith(f'id: {second_id}\nevent: history\n'.encode())
+        assert b'"3.0 * 4.0"' in event
+
+        # Новая запись приходит подписчику сразу после вычисления
+        client.post('/api/subtract', data=json.dumps({'a': 5, 'b': 1}), content_type='application/json')
+        event = next(events)
+        assert event.startswith(f'id: {prefix}-{self._event_number(second_id) + 1}\n'.encode())
+        response.close()
+
+    def test_history_stream_ids_survive_clear(self, client):
+        """Тест: после очистки истории номера событий продолжаются, и досылка ничего не теряет."""
+        for a in range(3):
+            client.post('/api/add', data=json.dumps({'a': a, 'b': 1}), content_type='application/json')
+        last_id = self._history_events(client, '', 3)[-1][0]
+        last_number = self._event_number(last_id)
+
+        client.delete('/api/history')
+        for a in range(5):
+            client.post('/api/multiply', data=json.dumps({'a': a, 'b': 2}), content_type='application/json')
+
+        events = self._history_events(client, last_id, 5)
+        assert [self._event_number(event_id) for event_id, _ in events] == list(range(last_number + 1, last_number + 6))
+        assert [data['result'] for _, data in events] == [0, 2, 4, 6, 8]
+
+    def test_history_stream_full_replay_after_restart(self, client, monkeypatch):
+        """Тест: идентификатор из другого процесса приводит к досылке всей истории."""
+        client.post('/api/add', data=json.dumps({'a': 1, 'b': 1}), content_type='application/json')
+        client.delete('/api/history')
+        for a in range(5):
+            client.post('/api/add', data=json.dumps({'a': a, 'b': 0}), content_type='application/json')
+        last_id = self._history_events(client, '', 5)[-1][0]
+
+        # Перезапуск: новый калькулятор загружает историю из файла, у процесса новый префикс
+        restarted = Calculator(history_file=calculator.history_file)
+        monkeypatch.setattr(app_module, 'calculator', restarted)
+        monkeypatch.setattr(app_module, '_history_etag_prefix', 'restarted')
+        for a in range(5, 15):
+            client.post('/api/add', data=json.dumps({'a': a, 'b': 0}), content_type='application/json')
+
+        events = self._history_events(client, last_id, 15)
+        assert [event_id for event_id, _ in events] == [f'restarted-{n}' for n in range(1, 16)]
+        assert [data['result'] for _, data in events] == list(range(15))
+
+    def test_stream_ndjson_operations(self, client):
+        """Тест потока операций в формате NDJSON."""
+        lines = [
+            {'operation': 'add', 'a': 1, 'b': 2},
+            {'operation': 'divide', 'a': 1, 'b': 0},
+            {'operation': 'round', 'value': 3.14159, 'precision': 2, 'method': 'down'},
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\n\nnot json\n'
+
+        response = client.post('/api/stream', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+
+        assert results[0]['result'] == 3
+        assert results[1] == {'line': 2, 'error': 'Деление на ноль невозможно'}
+        assert results[2]['result'] == 3.14
+        assert results[3]['line'] == 5
+        assert len(calculator.get_history()) == 2
+
+    def test_stream_unexpected_error_keeps_stream(self, client):
+        """Тест: непредвиденная ошибка в строке потока не обрывает остальные строки."""
+        lines = [
+            {'operation': None, 'a': 1, 'b': 2},
+            {'operation': 'round', 'value': 'inf', 'precision': 0},
+            {'operation': 'add', 'a': 1, 'b': 2},
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\n'
+
+        response = client.post('/api/stream', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        results = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+
+        assert [result.get('line') for result in results[:2]] == [1, 2]
+        assert all('error' in result for result in results[:2])
+        assert results[2]['result'] == 3
+
+    def test_server_timing_header(self, client):
+        """Тест заголовка Server-Timing с разбивкой по фазам."""
+        response = client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+        phases = [item.split(';')[0] for item in response.headers['Server-Timing'].split(', ')]
+        for phase in ('parse', 'validate', 'compute', 'persist', 'serialize', 'total'):
+            assert phase in phases
+
+    def test_server_timing_disabled(self, client, monkeypatch):
+        """Тест отключения заголовка Server-Timing в конфигурации."""
+        monkeypatch.setitem(app.config, 'SERVER_TIMING', False)
+        response = client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+        assert 'Server-Timing' not in response.headers
+
+    def test_history_filters(self, client):
+        """Тест фильтрации истории по типу операции, методу и диапазону результата."""
+        client.post('/api/add', data=json.dumps({'a': 1, 'b': 2}), content_type='application/json')
+        client.post('/api/multiply', data=json.dumps({'a': 3, 'b': 4}), content_type='application/json')
+        client.post('/api/add', data=json.dumps({'a': 10, 'b': 20}), content_type='application/json')
+        client.post(
+            '/api/round',
+            data=json.dumps({'value': 3.14159, 'precision': 2, 'method': 'down'}),
+            content_type='application/json',
+        )
+
+        data = json.loads(client.get('/api/history?operation=add').data)
+        assert [item['result'] for item in data['history']] == [3, 30]
+
+        data = json.loads(client.get('/api/history?operation=add&min_result=5').data)
+        assert [item['result'] for item in data['history']] == [30]
+
+        data = json.loads(client.get('/api/history?min_result=3&max_result=12').data)
+        assert [item['result'] for item in data['history']] == [3, 12, 3.14]
+
+        data = json.loads(client.get('/api/history?method=down').data)
+        assert data['count'] == 1
+        assert data['history'][0]['operation'].startswith('round(')
+
+        data = json.loads(client.get('/api/history?since=0&operation=multiply').data)
+        assert data['count'] == 1
+
+    def test_history_invalid_filter(self, client):
+        """Тест некорректного значения фильтра истории."""
+        response = client.get('/api/history?min_result=abc')
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize(
+        "op,expected",
+        [('sum', 1.0), ('product', 0.0), ('mean', 0.25), ('min', -1e16), ('max', 1e16)],
+    )
+    def test_reduce_operation(self, client, op, expected):
+        """Тест свертки массива через JSON."""
+        values = [1e16, 1.0, -1e16, 0.0]
+        response = client.post(
+            '/api/reduce', data=json.dumps({'op': op, 'values': values}), content_type='application/json'
+        )
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == 4
+        assert data['result'] == expected
+        assert len(calculator.get_history()) == 1
+
+    def test_reduce_streamed_body(self, client):
+        """Тест свертки массива, переданного потоком по числу на строку."""
+        body = '\n'.join(str(i) for i in range(1, 1001)) + '\n'
+        response = client.post('/api/reduce?op=sum', data=body, content_type='text/plain')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data == {'operation': 'sum', 'count': 1000, 'result': 500500.0}
+
+    def test_reduce_streamed_invalid_line(self, client):
+        """Тест ошибки в потоковом теле свертки с номером строки."""
+        response = client.post('/api/reduce?op=sum', data='1\n\nabc\n3\n', content_type='text/plain')
+        assert response.status_code == 400
+        assert json.loads(response.data) == {'line': 3, 'error': 'Некорректное число: abc'}
+        assert len(calculator.get_history()) == 0
+
+    def test_idempotency_key_rejected_for_streamed_body(self, client):
+        """Тест: Idempotency-Key с потоковым телом отклоняется, а не игнорируется."""
+        response = client.post(
+            '/api/reduce?op=sum', data='1\n2\n', content_type='text/plain', headers={'Idempotency-Key': 'stream-1'}
+        )
+        assert response.status_code == 400
+        assert 'Idempotency-Key' in json.loads(response.data)['error']
+        assert len(calculator.get_history()) == 0
+
+    def test_reduce_empty_values(self, client):
+        """Тест свертки пустого массива."""
+        response = client.post(
+            '/api/reduce', data=json.dumps({'op': 'max', 'values': []}), content_type='application/json'
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize('op', ['sum', 'product', 'min', 'max'])
+    @pytest.mark.parametrize('bad_value', [None, [1], 'abc', {'a': 1}])
+    def test_reduce_invalid_value(self, client, op, bad_value):
+        """Тест: некорректный элемент массива — ошибка клиента, а не сервера."""
+        response = client.post(
+            '/api/reduce', data=json.dumps({'op': op, 'values': [1, bad_value]}), content_type='application/json'
+        )
+        assert response.status_code == 400
+
+    def test_large_response_compressed(self, client):
+        """Тест сжатия большого ответа с сохранением условного GET."""
+        calculator.history = [(f'{i} + 1', i + 1) for i in range(200)]
+
+        response = client.get('/api/history', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert json.loads(gzip.decompress(response.data))['count'] == 200
+
+        etag = response.headers['ETag']
+        assert etag.startswith('W/')
+
+        # 304 несет тот же слабый валидатор и Vary, что и сжатый ответ 200
+        response = client.get('/api/history', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+    def test_large_response_deflate(self, client):
+        """Тест сжатия большого ответа в deflate."""
+        calculator.history = [(f'{i} + 1', i + 1) for i in range(200)]
+
+        response = client.get('/api/history', headers={'Accept-Encoding': 'deflate'})
+        assert response.headers['Content-Encoding'] == 'deflate'
+        assert json.loads(zlib.decompress(response.data))['count'] == 200
+
+    def test_small_response_not_compressed(self, client):
+        """Тест отсутствия сжатия у небольших ответов."""
+        response = client.post(
+            '/api/add',
+            data=json.dumps({'a': 1, 'b': 2}),
+            content_type='application/json',
+            headers={'Accept-Encoding': 'gzip'},
+        )
+        assert 'Content-Encoding' not in response.headers
+        assert json.loads(response.data)['result'] == 3
+
+    def test_bulk_binary_operation(self, client):
+        """Тест массовой операции в бинарном формате."""
+        body = binary_format.pack_request('multiply', [1, 2, 3], [10, 20, 0.5])
+        response = client.post('/api/bulk', data=body, content_type=binary_format.CONTENT_TYPE)
+        assert response.status_code == 200
+        assert response.mimetype == binary_format.CONTENT_TYPE
+        assert list(binary_format.unpack_response(response.data)) == [10.0, 40.0, 1.5]
+        assert len(calculator.get_history()) == 0
+
+    def test_bulk_binary_not_compressed(self, client):
+        """Тест: бинарный ответ не сжимается, даже если клиент принимает gzip."""
+        body = binary_format.pack_request('add', [float(i) for i in range(10000)], [1.0] * 10000)
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        response = client.post('/api/bulk', data=body, content_type=binary_format.CONTENT_TYPE, headers=headers)
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert binary_format.unpack_response(response.data)[-1] == 10000.0
+
+    def test_bulk_binary_round(self, client):
+        """Тест массового округления в бинарном формате."""
+        body = binary_format.pack_request('round', [3.14159, 2.71828], precision=2, method='down')
+        response = client.post('/api/bulk', data=body, content_type=binary_format.CONTENT_TYPE)
+        assert response.status_code == 200
+        assert list(binary_format.unpack_response(response.data)) == [3.14, 2.71]
+
+    @pytest.mark.parametrize(
+        "body,error",
+        [
+            (binary_format.pack_request('divide', [1.0], [0.0]), 'Деление на ноль невозможно'),
+            (binary_format.pack_request('add', [1.0, 2.0], [3.0, 4.0])[:-8], 'Длина тела'),
+            (binary_format.pack_request('add', [1.0, 2.0], [3.0, 4.0]) + bytes(8), 'Длина тела'),
+            (binary_format.pack_request('round', [1.0]) + binary_format.pack_floats([2.0]), 'Длина тела'),
+            (b'JUNK' + bytes(20), 'сигнатура'),
+        ],
+    )
+    def test_bulk_binary_invalid_body(self, client, body, error):
+        """Тест некорректных тел массовой операции."""
+        response = client.post('/api/bulk', data=body, content_type=binary_format.CONTENT_TYPE)
+        assert response.status_code == 400
+        assert error in json.loads(response.data)['error']
+
     def test_404_error(self, client):
         """Тест обработки 404 ошибки."""
         response = client.get('/api/nonexistent')
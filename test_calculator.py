@@ -3,7 +3,10 @@
 """
 
 import pytest
+import io
+import json
 import tempfile
+import threading
 from calculator import Calculator
 
 
@@ -96,3 +99,167 @@ def test_history_persistence(calculator):
     assert len(history) == 2
     assert history[0] == ("1 + 2", 3)
     assert history[1] == ("3 * 4", 12)
+
+
+def test_history_version_increases(calculator):
+    """Тест монотонного роста версии истории."""
+    version = calculator.history_version
+    calculator.add(1, 2)
+    assert calculator.history_version > version
+
+    version = calculator.history_version
+    calculator.clear_history()
+    assert calculator.history_version > version
+
+
+@pytest.mark.parametrize(
+    "export_format,expected",
+    [
+        ('ndjson', '{"operation": "1 + 2", "result": 3}\n'),
+        ('csv', 'operation,result\r\n1 + 2,3\r\n'),
+    ],
+)
+def test_export_history(calculator, export_format, expected):
+    """Тест выгрузки истории в файловый объект."""
+    calculator.add(1, 2)
+    output = io.StringIO()
+    calculator.export_history(output, export_format)
+    assert output.getvalue() == expected
+
+
+def test_subscription_receives_new_entries(calculator):
+    """Тест получения новых записей истории подписчиком."""
+    subscription = calculator.subscribe()
+    calculator.add(1, 2)
+    assert subscription.get(timeout=0) == (1, "1 + 2", 3)
+    assert subscription.get(timeout=0) is None
+
+
+def test_slow_subscriber_is_dropped(calculator):
+    """Тест отключения подписчика, который не успевает читать."""
+    subscription = calculator.subscribe(max_buffered=1)
+    calculator.add(1, 2)
+    calculator.add(3, 4)
+    assert subscription.dropped
+
+    calculator.add(5, 6)
+    assert subscription.get(timeout=0) == (1, "1 + 2", 3)
+    assert subscription.get(timeout=0) is None
+
+
+def test_deferred_history_saves_once(calculator):
+    """Тест отложенного сохранения истории в файл."""
+    with calculator.deferred_history():
+        calculator.add(1, 2)
+        calculator.multiply(3, 4)
+        with open(calculator.history_file, encoding='utf-8') as f:
+            assert f.read() == ''
+
+    with open(calculator.history_file, encoding='utf-8') as f:
+        assert len(json.load(f)) == 2
+
+
+def test_deferred_history_is_per_thread(calculator):
+    """Тест: отложенное сохранение в одном потоке не задерживает операции других потоков."""
+    with calculator.deferred_history():
+        calculator.add(1, 2)
+        worker = threading.Thread(target=calculator.multiply, args=(3, 4))
+        worker.start()
+        worker.join()
+
+        with open(calculator.history_file, encoding='utf-8') as f:
+            assert len(json.load(f)) == 2
+
+
+def test_history_snapshot_is_immutable(calculator):
+    """Тест неизменности снимка истории при последующих изменениях."""
+    calculator.add(1, 2)
+    snapshot = calculator.get_history()
+
+    calculator.multiply(3, 4)
+    assert len(snapshot) == 1
+    assert list(snapshot) == [("1 + 2", 3)]
+    assert snapshot[-1] == ("1 + 2", 3)
+    with pytest.raises(IndexError):
+        snapshot[1]
+
+    calculator.clear_history()
+    assert snapshot == [("1 + 2", 3)]
+
+
+def test_history_time_range_filter(calculator, monkeypatch):
+    """Тест фильтрации истории по времени записи."""
+    for timestamp, (a, b) in zip([100.0, 200.0, 300.0], [(1, 1), (2, 2), (3, 3)]):
+        monkeypatch.setattr("calculator.time.time", lambda: timestamp)
+        calculator.add(a, b)
+
+    assert calculator.get_history(since=150) == [("2 + 2", 4), ("3 + 3", 6)]
+    assert calculator.get_history(since=150, until=250) == [("2 + 2", 4)]
+    assert calculator.get_history(until=50) == []
+
+
+def test_history_result_range_filter(calculator):
+    """Тест фильтра по результату и при узком, и при широком диапазоне."""
+    for a in [5, 1, 4, 2, 3]:
+        calculator.add(a, 0)
+    calculator.multiply(2, 2)
+    calculator.multiply(float('nan'), 1)
+
+    # Узкий диапазон короче остальных кандидатов и сам задает перебор
+    assert calculator.get_history(min_result=4, max_result=4) == [("4 + 0", 4), ("2 * 2", 4)]
+    # Широкий диапазон проверяется по записям кандидата operation
+    assert calculator.get_history(operation='add', min_result=2) == [
+        ("5 + 0", 5), ("4 + 0", 4), ("2 + 0", 2), ("3 + 0", 3),
+    ]
+    assert calculator.get_history(max_result=1) == [("1 + 0", 1)]
+
+    # Записи, добавленные после запроса, попадают в индекс при следующем запросе
+    calculator.add(0, 0)
+    assert calculator.get_history(max_result=1) == [("1 + 0", 1), ("0 + 0", 0)]
+
+
+def test_history_result_index_merges_in_blocks():
+    """Тест: новые результаты не сливаются с основным индексом на каждом запросе."""
+    calculator = Calculator(history_file=None)
+    calculator.history = [(f"{i} + 0", float(i)) for i in range(10000)]
+    index = calculator._index
+    results = list(index._results)
+
+    for a in range(50):
+        calculator.add(a, 0.5)
+        assert calculator.get_history(min_result=a + 0.5, max_result=a + 0.5) == [(f"{a} + 0.5", a + 0.5)]
+    assert index._results == results
+    assert len(index._recent_results) == 50
+
+    # Когда малый список вырастает больше √n, он вливается в основной
+    for a in range(50, 101):
+        calculator.add(a, 0.5)
+    assert index._recent_results == []
+    assert len(index._results) == 10101
+    expected = [("99 + 0", 99), ("100 + 0", 100), ("99 + 0.5", 99.5)]
+    assert calculator.get_history(min_result=99, max_result=100) == expected
+
+
+@pytest.mark.parametrize(
+    "operation,a,b,expected",
+    [
+        ('add', [1, 2], [3, 4], [4, 6]),
+        ('divide', [1, 3], [2, 4], [0.5, 0.75]),
+        ('round', [3.14159, -2.555], None, [3.15, -2.56]),
+    ],
+)
+def test_bulk(calculator, operation, a, b, expected):
+    """Тест поэлементных операций над массивами."""
+    assert list(calculator.bulk(operation, a, b, precision=2 if operation == 'round' else 0)) == expected
+    assert len(calculator.get_history()) == 0
+
+
+@pytest.mark.parametrize("op,expected", [('product', -24.0), ('min', -3.0), ('max', 4.0)])
+def test_reduce_numpy(calculator, op, expected):
+    """Тест свертки через NumPy с той же проверкой элементов, что и без него."""
+    np = pytest.importorskip('numpy')
+    assert calculator.reduce(np.array([2, -3, 4]), op) == expected
+    assert calculator.reduce([2.0, -3.0, 4.0], op) == expected
+    for values in ([1, None], [1, [1]], [[1, 2]]):
+        with pytest.raises(ValueError):
+            calculator.reduce(values, op)
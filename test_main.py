@@ -0,0 +1,102 @@
+"""
+Тесты для пакетного режима CLI.
+"""
+
+import pytest
+import io
+import json
+from calculator import Calculator
+import main
+
+
+@pytest.fixture
+def calculator(tmp_path):
+    """Фикстура для создания калькулятора с временным файлом истории."""
+    return Calculator(history_file=str(tmp_path / 'history.json'))
+
+
+@pytest.mark.parametrize("line,expected", [
+    ("add 1 2", 3),
+    ("1 + 2", 3),
+    ("divide 1 4", 0.25),
+    ("10 * 3", 30),
+    ("round 3.14159 2 down", 3.14),
+    ("round 2.5 0 banker", 2),
+])
+def test_evaluate_line(calculator, line, expected):
+    """Тест вычисления строки пакетного режима."""
+    assert main.evaluate_line(calculator, line) == expected
+
+
+@pytest.mark.parametrize("line", ["power 2 3", "add 1", "round 1.5 0 sideways", "divide 1 0", "add x 2"])
+def test_evaluate_line_errors(calculator, line):
+    """Тест ошибок в строке пакетного режима."""
+    with pytest.raises(ValueError):
+        main.evaluate_line(calculator, line)
+
+
+class CountingOutput(io.StringIO):
+    """Вывод, считающий сбросы буфера."""
+
+    def __init__(self):
+        super().__init__()
+        self.flushes = []
+
+    def flush(self):
+        self.flushes.append(self.getvalue())
+        super().flush()
+
+
+def test_run_batch(calculator):
+    """Тест пакетного вычисления с пропуском пустых строк и комментариев."""
+    source = io.StringIO("add 1 2\n\n# комментарий\ndivide 1 0\n3 * 4\n")
+    out = io.StringIO()
+
+    assert main.run_batch(calculator, source, out) == 1
+    assert out.getvalue() == "3.0\nОшибка: Деление на ноль невозможно\n12.0\n"
+
+
+def test_run_batch_line_buffered(calculator):
+    """Тест сброса вывода после каждой строки."""
+    out = CountingOutput()
+    assert main.run_batch(calculator, io.StringIO("add 1 2\n3 * 4\n"), out, line_buffered=True) == 0
+    assert out.flushes[:2] == ["3.0\n", "3.0\n12.0\n"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch_saves_history_once(calculator, monkeypatch, workers):
+    """Тест однократного сохранения истории за пакет."""
+    saves = []
+    save_history = Calculator._save_history
+
+    def counting_save(self):
+        saves.append(self.history_file)
+        save_history(self)
+
+    monkeypatch.setattr(Calculator, '_save_history', counting_save)
+    source = io.StringIO(''.join(f"add {i} 1\n" for i in range(20)))
+    assert main.run_batch(calculator, source, io.StringIO(), workers=workers, chunk_size=3) == 0
+
+    assert saves == [calculator.history_file]
+    with open(calculator.history_file, encoding='utf-8') as f:
+        assert len(json.load(f)) == 20
+
+
+def test_main_workers_keep_order(tmp_path, monkeypatch, capsys):
+    """Тест порядка вывода и кода завершения при нескольких процессах."""
+    monkeypatch.chdir(tmp_path)
+    source = tmp_path / 'in.txt'
+    source.write_text(''.join(f"multiply {i} 2\n" for i in range(50)) + "divide 1 0\n", encoding='utf-8')
+
+    assert main.main(['--batch', str(source), '--workers', '2', '--chunk-size', '7']) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [f"{i * 2.0}" for i in range(50)] + ["Ошибка: Деление на ноль невозможно"]
+
+
+def test_main_missing_file(tmp_path, monkeypatch, capsys):
+    """Тест сообщения об ошибке для отсутствующего входного файла."""
+    monkeypatch.chdir(tmp_path)
+    assert main.main(['--batch', str(tmp_path / 'missing.txt')]) == 2
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'missing.txt' in captured.err